@@ -6,16 +6,70 @@ __all__ = [
     "ParseError"
 ]
 
+import re
+import sys
+from collections import OrderedDict
+from functools import lru_cache
 from typing import *
 from keyword import iskeyword
-from inspect import getmembers
-from html.parser import HTMLParser
-from xml.etree import ElementTree
+from html import unescape
 
 
-def prefixed_attributes(obj, prefix):
-    return {k[len(prefix):]: v
-            for k, v in getmembers(obj) if k.startswith(prefix)}
+def prefixed_attributes(cls, prefix):
+    # Walk the class dictionaries directly instead of using dir(), so
+    # that only matching names are looked up.
+    names = dict.fromkeys(k for klass in cls.__mro__ for k in vars(klass)
+                          if k.startswith(prefix))
+    return {k[len(prefix):]: getattr(cls, k) for k in names}
+
+
+# Serialized class attributes, indexed by the set of classes. Documents
+# tend to reuse a small number of class combinations.
+_class_strings: dict[frozenset, str] = {}
+_MAX_CLASS_STRINGS = 1024
+
+_MAX_TRANSFORM_CACHE_SIZE = 256
+
+# Short strings, such as whitespace between tags, are often repeated, so
+# they are interned to share storage and speed up comparisons.
+_MAX_INTERNED_LENGTH = 64
+
+# Elements whose contents are not parsed or escaped as HTML.
+_RAW_TEXT_ELEMENTS = ("script", "style")
+
+
+# Escaping uses the same approach as ElementTree: a substring test for
+# each special character, which is a fast C-level scan, and replace()
+# only when needed. This is faster than re.sub() or str.translate() for
+# both plain text and text with special characters.
+def _escape_text(text: str) -> str:
+    if "&" in text:
+        text = text.replace("&", "&amp;")
+    if "<" in text:
+        text = text.replace("<", "&lt;")
+    if ">" in text:
+        text = text.replace(">", "&gt;")
+    return text
+
+
+def _escape_attribute(value: str) -> str:
+    if "&" in value:
+        value = value.replace("&", "&amp;")
+    if ">" in value:
+        value = value.replace(">", "&gt;")
+    if '"' in value:
+        value = value.replace('"', "&quot;")
+    return value
+
+
+def _join_text(strings: list[str]) -> str:
+    """Combine a non-empty list of adjacent strings."""
+    if len(strings) == 1:
+        return strings[0]
+    text = "".join(strings)
+    if len(text) < _MAX_INTERNED_LENGTH:
+        text = sys.intern(text)
+    return text
 
 
 class Element:
@@ -29,35 +83,24 @@ class Element:
     element's ``name`` attribute.
     """
 
+    # Many elements have no attributes or no children, so the attribute
+    # dictionary and the child list are only allocated when needed.
+    # ``None`` in these slots is equivalent to an empty container.
+    __slots__ = ("_name", "_subclass", "_attributes", "_children")
+
     subclasses: ClassVar[dict[str, type]] = {}
     """Subclasses of Element, indexed by lowercase element names."""
 
     void: ClassVar[bool] = False
     """Whether this element is a void element."""
 
-    name: str
-    """The name of this element (e.g. ``div``, ``p``, ``span``)."""
-
-    attributes: dict[str, Any]
-    """This element's attributes.
-
-    Attribute names use underscores instead of dashes, so the
-    ``accept-charset`` attribute is accessed with the
-    ``"accept_charset"`` key. Attribute names that conflict with Python
-    keywords are prefixed with an underscore, so the ``class`` attribute
-    is accessed with the ``"_class"`` key. These conversions ensure that
-    attribute names are always valid Python identifiers, allowing them
-    to be provided as keyword arguments.
-    """
-
-    children: list[Any]
-    """This element's children.
-
-    Children are typically elements (including components and fragments)
-    or strings, but they can be arbitrary values.
+    pure: ClassVar[bool] = False
+    """Whether this component's transform depends only on its children
+    and attributes, allowing transform results to be cached.
     """
 
-    def __init_subclass__(cls, /, void: Optional[bool] = None):
+    def __init_subclass__(
+            cls, /, void: Optional[bool] = None, pure: Optional[bool] = None):
         """
         Initialize an Element subclass.
 
@@ -76,27 +119,59 @@ class Element:
 
         :param void: Whether this element is a void element (in other
             words, whether this element should not have closing tags)
+        :param pure: Whether this component's transform is a pure
+            function of its children and attributes. Transform results
+            of pure components are cached and reused when a component
+            with equal children and attributes is rendered again.
         """
         if void is not None:
             cls.void = void
+        if pure is not None:
+            cls.pure = pure
+        if cls.pure:
+            cls.transform_cache = OrderedDict()
         cls.parse_funcs = prefixed_attributes(cls, "parse_")
         cls.str_funcs = prefixed_attributes(cls, "str_")
-        Element.subclasses[cls.__name__.lower()] = cls
+
+        # Build the default attributes once instead of once per element.
+        # Mutable values are copied for each element in ``__new__``.
+        cls.element_name = cls.__name__.lower()
+        cls.attributes_template = cls.default_attributes()
+        cls.mutable_attributes = tuple(
+                k for k, v in cls.attributes_template.items()
+                if isinstance(v, (set, list, dict)))
+
+        Element.subclasses[cls.element_name] = cls
 
     def __new__(cls, *args, **attributes):
         element = super().__new__(Element)
 
         if cls is Element:
-            name = args[0].lower()
+            # Names are usually lowercase already, so try them as-is
+            # before converting them.
+            name = args[0]
+            subclass = Element.subclasses.get(name)
+            if subclass is None:
+                subclass = Element.subclasses[name.lower()]
             children = args[1:]
         else:
-            name = cls.__name__.lower()
+            subclass = cls
             children = args
 
-        element.name = name
-        element.attributes = Element.subclasses[name].default_attributes()
-        element.children = []
-        element(*children, **attributes)
+        template = subclass.attributes_template
+        if template:
+            attributes_copy = template.copy()
+            for key in subclass.mutable_attributes:
+                attributes_copy[key] = template[key].copy()
+        else:
+            attributes_copy = None
+
+        element._name = subclass.element_name
+        element._subclass = subclass
+        element._attributes = attributes_copy
+        element._children = None
+        if children or attributes:
+            element(*children, **attributes)
 
         return element
 
@@ -113,6 +188,53 @@ class Element:
         """
         pass
 
+    @property
+    def name(self) -> str:
+        """The name of this element (e.g. ``div``, ``p``, ``span``)."""
+        return self._name
+
+    @name.setter
+    def name(self, name: str) -> None:
+        # Keep the subclass in sync, so that it doesn't need to be looked
+        # up by name for every element during rendering.
+        self._subclass = Element.subclasses[name]
+        self._name = name
+
+    @property
+    def attributes(self) -> dict[str, Any]:
+        """This element's attributes.
+
+        Attribute names use underscores instead of dashes, so the
+        ``accept-charset`` attribute is accessed with the
+        ``"accept_charset"`` key. Attribute names that conflict with
+        Python keywords are prefixed with an underscore, so the
+        ``class`` attribute is accessed with the ``"_class"`` key. These
+        conversions ensure that attribute names are always valid Python
+        identifiers, allowing them to be provided as keyword arguments.
+        """
+        if self._attributes is None:
+            self._attributes = {}
+        return self._attributes
+
+    @attributes.setter
+    def attributes(self, attributes: dict[str, Any]) -> None:
+        self._attributes = attributes
+
+    @property
+    def children(self) -> list[Any]:
+        """This element's children.
+
+        Children are typically elements (including components and
+        fragments) or strings, but they can be arbitrary values.
+        """
+        if self._children is None:
+            self._children = []
+        return self._children
+
+    @children.setter
+    def children(self, children: list[Any]) -> None:
+        self._children = children
+
     def __call__(self, *children, **attributes) -> "Element":
         """Add children and add or modify attributes.
 
@@ -123,13 +245,38 @@ class Element:
             be prefixed with an underscore.
         :return: This element.
         """
-        self.children.extend(children)
-        self.attributes.update(attributes)
+        # Most calls add a single child, such as li("cat").
+        if len(children) == 1:
+            if self._children is None:
+                self._children = [children[0]]
+            else:
+                self._children.append(children[0])
+        elif children:
+            if self._children is None:
+                self._children = list(children)
+            else:
+                self._children.extend(children)
+
+        if attributes:
+            if self._attributes is None:
+                # The keyword arguments are already a new dictionary.
+                self._attributes = attributes
+            else:
+                self._attributes.update(attributes)
         return self
 
     def copy(self) -> "Element":
         """Return a shallow copy of this element."""
-        return Element(self.name, *self.children, **self.attributes)
+        # Copy the slots directly instead of going through __new__ and
+        # __call__, which would repack the children and attributes.
+        element = object.__new__(Element)
+        element._name = self._name
+        element._subclass = self._subclass
+        attributes = self._attributes
+        children = self._children
+        element._attributes = None if attributes is None else attributes.copy()
+        element._children = None if children is None else children.copy()
+        return element
 
     def shallow_normalize(self) -> None:
         """Normalize this element's children.
@@ -140,35 +287,63 @@ class Element:
         To normalize this element's entire subtree, use ``normalize``
         instead.
         """
-        flattened = []
+        # Most elements are already normalized, so check for fragments,
+        # empty strings, and adjacent strings before rebuilding the list.
+        last_is_str = False
         for child in self:
-            if isinstance(child, Element) and not child.name:
-                flattened.extend(child)
+            if isinstance(child, str):
+                if not child or last_is_str:
+                    break
+                last_is_str = True
+            elif type(child) is Element and not child._name:
+                break
             else:
-                flattened.append(child)
+                last_is_str = False
+        else:
+            return
 
+        # Flatten fragments and combine strings in a single pass. Runs
+        # of adjacent strings are joined once at the end of each run,
+        # because repeated concatenation is quadratic on some Python
+        # implementations (such as PyPy).
         normalized = []
-        for child in flattened:
-            if isinstance(child, str):
-                if not child:
+        run = []
+        for child in self:
+            if type(child) is Element and not child._name:
+                items = child._children or ()
+            else:
+                items = (child,)
+
+            for item in items:
+                if isinstance(item, str):
                     # Remove empty strings.
-                    continue
-                elif normalized and isinstance(normalized[-1], str):
-                    # Combine adjacent strings.
-                    normalized[-1] += child
+                    if item:
+                        run.append(item)
                 else:
-                    normalized.append(child)
-            else:
-                normalized.append(child)
+                    if run:
+                        normalized.append(_join_text(run))
+                        run.clear()
+                    normalized.append(item)
+
+        if run:
+            normalized.append(_join_text(run))
 
         self.children = normalized
 
     def normalize(self) -> None:
         """Recursively normalize this element's subtree."""
-        for child in self:
-            if isinstance(child, Element):
-                child.shallow_normalize()
-        self.shallow_normalize()
+        # Normalize descendants before their parents, using an explicit
+        # stack so that deeply nested trees don't hit the recursion limit.
+        stack = [(self, iter(self))]
+        while stack:
+            element, children = stack[-1]
+            for child in children:
+                if type(child) is Element:
+                    stack.append((child, iter(child)))
+                    break
+            else:
+                element.shallow_normalize()
+                stack.pop()
 
     @staticmethod
     def transform(*children, **attributes) -> Any:
@@ -184,29 +359,132 @@ class Element:
         """
         return None
 
-    def render(self) -> "Element":
-        """Recursively transform this component and its children.
+    def _resolve(self) -> Any:
+        """Transform this component until no more transformations are
+        necessary.
 
-        :return: The transformed and normalized result.
+        :return: The final element, or the first transform result that
+            is not an element.
         """
-        # Transform recursively until None is returned, indicating that
-        # no more transformations are necessary.
-        subclass = Element.subclasses[self.name]
-        transformed = subclass.transform(*self.children, **self.attributes)
-        if isinstance(transformed, Element):
-            return transformed.render()
-        elif transformed is not None:
+        element = self
+        # A component that always transforms into another component
+        # would loop forever, so limit the chain like recursion would.
+        for _ in range(sys.getrecursionlimit()):
+            subclass = element._subclass
+            if subclass.transform is Element.transform:
+                # Built-in elements aren't transformed, so don't pack
+                # their children and attributes into arguments.
+                return element
+            elif subclass.pure:
+                transformed = element._cached_transform(subclass)
+            else:
+                transformed = subclass.transform(
+                        *(element._children or ()),
+                        **(element._attributes or {}))
+            if transformed is None:
+                return element
+            elif type(transformed) is not Element:
+                return transformed
+            element = transformed
+        raise RecursionError(
+                f"Component {repr(element._name)} exceeded the maximum "
+                "transform depth")
+
+    def _transform(self) -> tuple["Element", bool]:
+        """Transform this component for ``render``.
+
+        :return: A copy of the final element, and whether the result is
+            already fully rendered.
+        """
+        resolved = self._resolve()
+        if type(resolved) is not Element:
             # Wrap non-Element results in a fragment.
-            return Element("", transformed)
+            return Element("", resolved), True
+
+        # The rendered element must not share mutable attribute values
+        # with its source, which may be a cached transform result.
+        element = resolved.copy()
+        attributes = element._attributes
+        if attributes:
+            for name, value in attributes.items():
+                if isinstance(value, (set, list, dict)):
+                    attributes[name] = value.copy()
+        return element, False
+
+    def _cached_transform(self, subclass: type) -> Any:
+        """Call the transform of a pure component, reusing the previous
+        result for equal children and attributes.
+        """
+        children = self._children or ()
+        attributes = self._attributes or {}
+
+        # Include types in the key so that values like 1 and True,
+        # which compare equal, are cached separately.
+        try:
+            key = (
+                tuple((type(child), child) for child in children),
+                frozenset(
+                    (name, type(value),
+                     frozenset(value) if isinstance(value, set) else value)
+                    for name, value in attributes.items()),
+            )
+            hash(key)
+        except TypeError:
+            # Unhashable children or attributes can't be cached.
+            return subclass.transform(*children, **attributes)
+
+        cache = subclass.transform_cache
+        try:
+            cache.move_to_end(key)
+            return cache[key]
+        except KeyError:
+            pass
+
+        transformed = subclass.transform(*children, **attributes)
+        cache[key] = transformed
+        if len(cache) > _MAX_TRANSFORM_CACHE_SIZE:
+            cache.popitem(last=False)
+        return transformed
 
-        rendered = self.copy()
+    def render(self) -> "Element":
+        """Recursively transform this component and its children.
 
-        # Render all children.
-        for i, child in enumerate(rendered):
-            if isinstance(child, Element):
-                rendered[i] = child.render()
+        :return: The transformed and normalized result.
+        """
+        rendered, done = self._transform()
+        if done:
+            return rendered
+
+        # Render descendants in post-order with an explicit stack, so
+        # that deeply nested trees don't hit the recursion limit.
+        # Each entry also records whether the parent needs to be
+        # normalized, which is only the case if it has fragments, empty
+        # strings, or adjacent strings.
+        stack = [(rendered, 0, False)]
+        while stack:
+            parent, i, dirty = stack.pop()
+            children = parent._children or ()
+            while i < len(children):
+                child = children[i]
+                i += 1
+                if type(child) is Element:
+                    child, done = child._transform()
+                    children[i - 1] = child
+                    if not child._name:
+                        dirty = True
+                    if not done:
+                        # Resume this parent after the child is rendered.
+                        stack.append((parent, i, dirty))
+                        stack.append((child, 0, False))
+                        break
+                elif isinstance(child, str):
+                    previous = children[i - 2] if i > 1 else None
+                    if not child or isinstance(previous, str):
+                        dirty = True
+            else:
+                if dirty:
+                    parent.shallow_normalize()
 
-        rendered.shallow_normalize()
         return rendered
 
     def _container_proxy(self, key: Union[str, int, slice]):
@@ -233,16 +511,16 @@ class Element:
 
     def __iter__(self):
         """Iterate over this element's children."""
-        return iter(self.children)
+        return iter(self._children or ())
 
     def __len__(self):
         """Return the number of children that this element has."""
-        return len(self.children)
+        return len(self._children or ())
 
     def __contains__(self, key: str) -> bool:
         """Return whether this element has an attribute."""
         if isinstance(key, str):
-            return key in self.attributes
+            return self._attributes is not None and key in self._attributes
         else:
             raise TypeError(f"Expected str; got {type(key).__name__}")
 
@@ -250,72 +528,136 @@ class Element:
         if not isinstance(other, Element):
             return NotImplemented
         return (self.name == other.name
-                and self.attributes == other.attributes
-                and self.children == other.children)
+                and (self._attributes or {}) == (other._attributes or {})
+                and (self._children or []) == (other._children or []))
 
     def __repr__(self):
-        if self.attributes:
-            attributes = f", **{self.attributes}"
+        if self._attributes:
+            attributes = f", **{self._attributes}"
         else:
             attributes = ""
 
-        if self.children:
-            children = f"({', '.join(repr(child) for child in self.children)})"
+        if self._children:
+            children = f"({', '.join(repr(child) for child in self)})"
         else:
             children = ""
 
         return f"Element({repr(self.name)}{attributes}){children}"
 
     @staticmethod
-    def parse(data: str) -> "Element":
-        """Parse HTML and return the parsed nodes in a fragment."""
-        parser = Parser()
-        parser.feed(data)
-        return parser.close()
-
-    def _add_to_builder(self, builder: ElementTree.TreeBuilder) -> None:
-        subclass = Element.subclasses[self.name]
-
-        attributes = {}
-        for name, value in self.attributes.items():
-            if name in subclass.str_funcs:
-                value = subclass.str_funcs[name](value)
+    def parse(data: str, backend: Optional[str] = None) -> "Element":
+        """Parse HTML and return the parsed nodes in a fragment.
+
+        :param backend: ``None`` to use the built-in parser, or
+            ``"lxml"`` to use lxml's HTML parser (which requires the
+            ``lxml`` package). lxml is faster for large documents, but
+            repairs invalid markup instead of raising ``ParseError``.
+        """
+        if backend is None:
+            parser = Parser()
+            parser.feed(data)
+            return parser.close()
+        elif backend == "lxml":
+            return parse_lxml(data)
+        else:
+            raise ValueError(f"Unknown parser backend: {repr(backend)}")
+
+    def _html_attributes(self) -> Iterator[tuple[str, str]]:
+        """Yield the HTML name and string value of each attribute,
+        skipping attributes that have no string representation.
+        """
+        str_funcs = self._subclass.str_funcs
+        for name, value in self._attributes.items():
+            str_func = str_funcs.get(name)
+            if str_func is None:
+                value = str(value)
+            else:
+                value = str_func(value)
                 if value is None:
                     continue
-            else:
-                value = str(value)
-            attributes[python_name_to_html(name)] = value
+            yield python_name_to_html(name), value
+
+    def _write_start_tag(self, parts: list[str]) -> None:
+        if self._name:
+            parts.append("<" + self._name)
+            if self._attributes:
+                for name, value in self._html_attributes():
+                    parts.append(f' {name}="{_escape_attribute(value)}"')
+            parts.append(">")
+
+    def _write_end_tag(self, parts: list[str]) -> None:
+        if self._name and not self._subclass.void:
+            parts.append(f"</{self._name}>")
+
+    def _open_rendered(self, parts: list[str], raw_text: bool) -> Any:
+        """Transform this component and write its start tag, or write
+        the transform result if it isn't an element.
+
+        :param raw_text: Whether text should be written without escaping.
+        :return: A stack entry for ``_render_to``, or ``None`` if the
+            result has no children to render.
+        """
+        resolved = self._resolve()
+        if type(resolved) is not Element:
+            text = str(resolved)
+            parts.append(text if raw_text else _escape_text(text))
+            return None
 
-        builder.start(self.name, attributes)
+        resolved._write_start_tag(parts)
+        if resolved._name:
+            raw_text = resolved._name in _RAW_TEXT_ELEMENTS
+        return resolved, iter(resolved), raw_text
 
-        for child in self:
-            if isinstance(child, Element):
-                child._add_to_builder(builder)
-            else:
-                builder.data(str(child))
+    def _render_to(self, parts: list[str]) -> None:
+        """Render this element and append the resulting HTML to a list of
+        strings.
 
-        builder.end(self.name)
+        This produces the same HTML as serializing the result of
+        ``render``, but in a single pass: fragments are written without
+        tags instead of being flattened, and no rendered copies are made.
+        """
+        append = parts.append
+
+        entry = self._open_rendered(parts, False)
+        if entry is None:
+            return
+
+        stack = [entry]
+        while stack:
+            element, children, raw_text = stack[-1]
+            for child in children:
+                # Children are almost always strings or elements, so check
+                # for those exact types before falling back to str().
+                if type(child) is str:
+                    append(child if raw_text else _escape_text(child))
+                elif type(child) is Element:
+                    entry = child._open_rendered(parts, raw_text)
+                    if entry is not None:
+                        stack.append(entry)
+                        break
+                else:
+                    text = str(child)
+                    append(text if raw_text else _escape_text(text))
+            else:
+                element._write_end_tag(parts)
+                stack.pop()
 
     def __str__(self):
         """Render this element and convert it to an HTML string."""
-        rendered = self.render()
-
-        builder = ElementTree.TreeBuilder()
-        rendered._add_to_builder(builder)
-        root = builder.close()
-
-        string = ElementTree.tostring(root, encoding="unicode", method="html")
-        if not rendered.name:
-            # Remove fragment start and end tags.
-            string = string[2:-3]
-        return string
+        parts = []
+        self._render_to(parts)
+        return "".join(parts)
 
     @staticmethod
     def default_attributes() -> dict[str, Any]:
         """Return a dictionary of default attributes for this type of
         element.
+
+        This method is called once when the subclass is created. Each
+        new element receives a copy of the result, and any ``set``,
+        ``list``, or ``dict`` values are copied as well.
         """
-        return dict(_class=set())
+        return {}
 
     @staticmethod
     def parse__class(_class):
@@ -323,13 +665,24 @@ class Element:
 
     @staticmethod
     def str__class(_class):
-        if _class:
-            return " ".join(sorted(_class))
-        else:
+        if not _class:
             return None
 
+        key = frozenset(_class)
+        try:
+            return _class_strings[key]
+        except KeyError:
+            pass
+
+        if len(_class_strings) >= _MAX_CLASS_STRINGS:
+            _class_strings.clear()
+        string = _class_strings[key] = " ".join(sorted(key))
+        return string
+
 
-def component(transform_or_name: Union[str, Callable], /, **kwargs) -> type:
+def component(
+        transform_or_name: Union[str, Callable, None] = None, /,
+        **kwargs) -> Union[type, Callable[[Callable], type]]:
     """Create a new component type from a transform function or string.
 
     If a transform function is provided, the function name is used as
@@ -337,8 +690,12 @@ def component(transform_or_name: Union[str, Callable], /, **kwargs) -> type:
     as the element name, and the component is not transformed.
 
     All keyword arguments are passed to ``Element.__init_subclass__()``.
+    If only keyword arguments are provided, return a decorator that
+    applies them, so that ``@component(pure=True)`` can be used.
     """
-    if isinstance(transform_or_name, str):
+    if transform_or_name is None:
+        return lambda transform: component(transform, **kwargs)
+    elif isinstance(transform_or_name, str):
         transform = None
         name = transform_or_name
     elif callable(transform_or_name):
@@ -357,6 +714,10 @@ def component(transform_or_name: Union[str, Callable], /, **kwargs) -> type:
     return type(name, (Element,), class_dict, **kwargs)
 
 
+# Attribute names come from a small vocabulary, so conversions are
+# memoized. The caches are bounded because parsed documents can contain
+# arbitrary attribute names.
+@lru_cache(maxsize=1024)
 def html_name_to_python(name: str) -> str:
     name = name.replace("-", "_")
     if iskeyword(name):
@@ -364,6 +725,7 @@ def html_name_to_python(name: str) -> str:
     return name
 
 
+@lru_cache(maxsize=1024)
 def python_name_to_html(name: str) -> str:
     if name.startswith("_") and iskeyword(name[1:]):
         name = name[1:]
@@ -371,43 +733,150 @@ def python_name_to_html(name: str) -> str:
     return name
 
 
-class Parser(HTMLParser):
+# Each match is one token. Comments, declarations, processing
+# instructions, and malformed end tags are ignored, and a "<" that does
+# not start any markup is treated as text.
+#
+# The tag name and attributes are matched possessively, so a start tag
+# without a closing ">" fails without backtracking. The end of a comment
+# is found by Parser.parse, because a lazy match would scan to the end
+# of the input for every unclosed comment.
+_TOKEN_PATTERN = re.compile(r"""
+    (?P<text>[^<]+)
+  | (?P<comment><!--)
+  | (?P<start_tag>
+        <(?P<tag>[a-zA-Z][^\t\n\r\f />]*+)
+        (?P<attributes>(?:"[^"]*"|'[^']*'|[^"'>])*+)>)
+  | (?P<end_tag></(?P<end_tag_name>[a-zA-Z][^\t\n\r\f />]*)[^>]*>)
+  | (?P<markup><[!?/][^>]*>)
+  | (?P<less_than><)
+""", re.DOTALL | re.VERBOSE)
+
+_ATTRIBUTE_PATTERN = re.compile(r"""
+    ([^\s/>"'=][^\s/>=]*)
+    (?:\s*=\s*("[^"]*"|'[^']*'|(?!["'])[^\s>]*))?
+""", re.VERBOSE)
+
+
+class Parser:
+    def __init__(self):
+        self.reset()
+
     def reset(self):
-        super().reset()
+        self.chunks = []
+        self.text = []
         self.root = Element("")
         self.stack = [self.root]
 
+    def feed(self, data):
+        self.chunks.append(data)
+
     def close(self):
-        super().close()
+        self.parse("".join(self.chunks))
+        self.chunks = []
+        self.flush_text()
+
         unclosed_tags = len(self.stack) - 1
         if unclosed_tags > 0:
             raise ParseError(f"{unclosed_tags} unclosed tag(s)")
         return self.root
 
+    def parse(self, data):
+        match_token = _TOKEN_PATTERN.match
+
+        # All markup ends with ">", so anything after the last ">" is
+        # text. Stopping there keeps failed matches from scanning to the
+        # end of the input again for every "<".
+        end = data.rfind(">") + 1
+        comment_end = 0
+
+        pos = 0
+        while pos < end:
+            match = match_token(data, pos, end)
+            pos = match.end()
+            kind = match.lastgroup
+
+            if kind == "text":
+                text = match.group()
+                if "&" in text:
+                    text = unescape(text)
+                self.text.append(text)
+            elif kind == "start_tag":
+                tag = match.group("tag").lower()
+                attributes, self_closing = parse_attributes(
+                        match.group("attributes"))
+                self.open_tag(tag, attributes, self_closing)
+
+                if tag in _RAW_TEXT_ELEMENTS and not self_closing:
+                    pos = self.raw_text(data, pos, tag)
+            elif kind == "end_tag":
+                self.end_tag(match.group("end_tag_name").lower())
+            elif kind == "less_than":
+                self.text.append("<")
+            elif kind == "comment":
+                # The next "-->" is reused until it has been passed.
+                if comment_end != -1 and comment_end < pos:
+                    comment_end = data.find("-->", pos)
+                if comment_end != -1:
+                    pos = comment_end + 3
+                else:
+                    # Unclosed comments are ignored like other markup.
+                    pos = data.find(">", pos) + 1
+
+        if pos < len(data):
+            text = data[pos:]
+            if "&" in text:
+                text = unescape(text)
+            self.text.append(text)
+
+    def raw_text(self, data, pos, tag):
+        """Add the contents of a raw text element and close it.
+
+        :return: The position after the end tag.
+        """
+        end = re.compile(rf"</\s*{tag}\s*>", re.IGNORECASE).search(data, pos)
+        if end is None:
+            # The element is never closed, so close() will report it.
+            text_end = tag_end = len(data)
+        else:
+            text_end, tag_end = end.span()
+
+        if text_end > pos:
+            self.text.append(data[pos:text_end])
+        if end is not None:
+            self.end_tag(tag)
+        return tag_end
+
     def add(self, value):
         self.stack[-1](value)
 
-    def open_tag(self, tag, attributes, self_closing):
-        subclass = Element.subclasses[tag]
+    def flush_text(self):
+        """Add pending text as a single string.
 
-        attributes = {html_name_to_python(k): v for k, v in attributes}
-        for name, value in attributes.items():
-            if name in subclass.parse_funcs:
-                attributes[name] = subclass.parse_funcs[name](value)
+        Text is split into several tokens by ignored markup (such as
+        comments) and stray "<" characters, so it is buffered until the
+        next tag instead of being added one token at a time.
+        """
+        if self.text:
+            text = "".join(self.text)
+            if len(text) < _MAX_INTERNED_LENGTH:
+                text = sys.intern(text)
+            self.add(text)
+            self.text.clear()
 
-        element = subclass(**attributes)
+    def open_tag(self, tag, attributes, self_closing):
+        self.flush_text()
+        element = new_parsed_element(tag, attributes)
         self.add(element)
 
-        if not subclass.void and not self_closing:
+        if not element._subclass.void and not self_closing:
             self.stack.append(element)
 
     def close_tag(self):
         self.stack.pop()
 
-    def handle_starttag(self, tag, attrs):
-        self.open_tag(tag, attrs, False)
-
-    def handle_endtag(self, tag):
+    def end_tag(self, tag):
+        self.flush_text()
         start_tag = self.stack[-1].name
         if tag == start_tag:
             self.close_tag()
@@ -420,11 +889,205 @@ class Parser(HTMLParser):
                 raise ParseError(
                         f"End tag {repr(tag)} has no matching start tag")
 
-    def handle_startendtag(self, tag, attrs):
-        self.open_tag(tag, attrs, True)
 
-    def handle_data(self, data):
-        self.add(data)
+def new_parsed_element(tag, attributes):
+    """Create an element from a tag name and a list of attribute
+    name-value pairs, applying the subclass's attribute parsing.
+    """
+    subclass = Element.subclasses[tag]
+    parse_funcs = subclass.parse_funcs
+
+    # Convert, parse, and store attributes in one pass, directly in the
+    # new element's attribute dictionary.
+    element = subclass()
+    if not attributes:
+        return element
+
+    element_attributes = element.attributes
+    for name, value in attributes:
+        name = html_name_to_python(name)
+        parse_func = parse_funcs.get(name)
+        if parse_func is not None:
+            value = parse_func(value)
+        element_attributes[name] = value
+    return element
+
+
+# Elements that lxml adds to every document if they are missing.
+_IMPLICIT_TAGS = ("html", "head", "body")
+
+# Matches a superset of the start tags of those elements, including any
+# that appear in comments or raw text.
+_IMPLICIT_START_TAG_PATTERN = re.compile(
+        r"<(?:html|head|body)[\t\n\r\f />]", re.IGNORECASE)
+
+_FINAL_HTML_END_TAG_PATTERN = re.compile(
+        r"</html[^>]*>([\t\n\r\f ]*)\Z", re.IGNORECASE)
+
+
+class ScanComplete(Exception):
+    pass
+
+
+class DocumentScanner(Parser):
+    """Find the html, head, and body start tags that the built-in parser
+    would see, and the text before and after the html element, without
+    building any elements.
+
+    :param stop_at_body: Whether to stop at the body start tag, which
+        follows the html and head start tags. The text after the html
+        element is not available then.
+    """
+
+    def __init__(self, stop_at_body=False):
+        self.stop_at_body = stop_at_body
+        super().__init__()
+
+    def reset(self):
+        super().reset()
+        self.tags = set()
+        self.leading = ""
+
+    def parse(self, data):
+        try:
+            super().parse(data)
+        except ScanComplete:
+            pass
+
+    def open_tag(self, tag, attributes, self_closing):
+        if tag in _IMPLICIT_TAGS:
+            if tag == "html" and "html" not in self.tags:
+                self.leading = "".join(self.text)
+            self.tags.add(tag)
+            if tag == "body" and self.stop_at_body:
+                raise ScanComplete
+        self.text.clear()
+
+    def end_tag(self, tag):
+        self.text.clear()
+
+    @property
+    def trailing(self):
+        return "".join(self.text)
+
+
+def parse_lxml(data):
+    """Parse HTML with lxml and return the parsed nodes in a fragment.
+
+    For valid HTML, the result matches the built-in parser, except for
+    valueless attributes. lxml fills in boolean attributes it
+    recognizes (such as ``disabled``) with the attribute name, which is
+    mapped back to ``None``. Other valueless attributes are parsed as
+    empty strings.
+    """
+    try:
+        from lxml.html import document_fromstring
+    except ImportError as e:
+        raise ImportError(
+                "The lxml parser backend requires the lxml package") from e
+
+    # lxml always builds a complete document, so only keep the html,
+    # head, and body elements whose start tags appear in the input.
+    explicit_tags = set()
+    if _IMPLICIT_START_TAG_PATTERN.search(data):
+        # Documents usually end with the html end tag and whitespace, so
+        # the scan can stop at the body start tag.
+        final_end_tag = _FINAL_HTML_END_TAG_PATTERN.match(
+                data, max(data.lower().rfind("</html"), 0))
+        scanner = DocumentScanner(stop_at_body=final_end_tag is not None)
+        scanner.parse(data)
+        explicit_tags = scanner.tags
+
+    if explicit_tags:
+        document = document_fromstring(data)
+        nodes = [document]
+        text = ""
+    else:
+        document = document_fromstring(f"<html><body>{data}</body></html>")
+        body = document.find("body")
+        nodes = list(body)
+        text = body.text or ""
+
+    root = Element("")
+    trailing = ""
+    if "html" in explicit_tags:
+        # lxml discards the whitespace around the html element.
+        if scanner.leading.isspace():
+            text = scanner.leading
+        if final_end_tag is not None:
+            trailing = final_end_tag.group(1)
+        else:
+            trailing = scanner.trailing
+
+    # Convert the lxml tree with an explicit stack. Each entry holds the
+    # element to add children to, an iterator over the lxml children,
+    # and a buffer of pending text, so that text on both sides of a
+    # dropped comment is combined. Implicit elements are replaced with
+    # their children, so they share their parent's buffer, and their
+    # tail is added after their children.
+    stack = [(root, iter(nodes), [text] if text else [], None)]
+    while stack:
+        parent, lxml_children, text, implicit_tail = stack[-1]
+        for node in lxml_children:
+            # Comments and processing instructions have non-string tags.
+            # They are dropped, but the text after them is kept.
+            if not isinstance(node.tag, str):
+                if node.tail:
+                    text.append(node.tail)
+                continue
+
+            if node.tag in _IMPLICIT_TAGS and node.tag not in explicit_tags:
+                if node.text:
+                    text.append(node.text)
+                stack.append((parent, iter(node), text, node.tail or ""))
+                break
+
+            if text:
+                parent(_join_text(text))
+                text.clear()
+            element = new_parsed_element(node.tag, [
+                (name, None if value == name else value)
+                for name, value in node.items()])
+            parent(element)
+            if node.tail:
+                text.append(node.tail)
+            stack.append((element, iter(node),
+                          [node.text] if node.text else [], None))
+            break
+        else:
+            if implicit_tail is not None:
+                if implicit_tail:
+                    text.append(implicit_tail)
+            elif text:
+                parent(_join_text(text))
+            stack.pop()
+
+    if trailing.isspace():
+        root(trailing)
+    return root
+
+
+def parse_attributes(data):
+    """Parse the attributes in a start tag into a list of name-value
+    pairs. Attributes without values have a value of ``None``.
+
+    :return: The attributes, and whether the tag is self-closing.
+    """
+    attributes = []
+    end = 0
+    for match in _ATTRIBUTE_PATTERN.finditer(data):
+        name, value = match.groups()
+        if value is not None:
+            if value[:1] in ("'", '"'):
+                value = value[1:-1]
+            value = unescape(value)
+        attributes.append((name.lower(), value))
+        end = match.end()
+
+    # A "/" at the end of an unquoted value is part of the value, so the
+    # tag is only self-closing if a "/" follows the last attribute.
+    self_closing = data[end:].lstrip() == "/"
+    return attributes, self_closing
 
 
 class ParseError(Exception):
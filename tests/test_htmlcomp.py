@@ -1,4 +1,10 @@
 import unittest
+from time import perf_counter
+
+try:
+    import lxml
+except ImportError:
+    lxml = None
 
 from htmlcomp import *
 from htmlcomp.elements import *
@@ -38,6 +44,80 @@ class TestHtmlComp(unittest.TestCase):
             fragment(div("Oops, ", img(src="banana.png"), " I did it again!"))
         )
 
+    def test_parse_markup(self):
+        self.assertEqual(
+            Element.parse(
+                '<!DOCTYPE html><!-- comment -->'
+                '<P Title=\'a "quote"\'>Fish &amp; chips</P>'
+                '<input disabled value=3>'
+                '<p>1 < 2<!-- comment -->, 3 &gt; 2</p>'),
+            fragment(
+                p("Fish & chips", title='a "quote"'),
+                input(disabled=None, value="3"),
+                p("1 < 2, 3 > 2"),
+            )
+        )
+
+    def test_parse_unquoted_attributes(self):
+        self.assertEqual(
+            Element.parse('<a href=https://example.com/>Example</a>'),
+            fragment(a("Example", href="https://example.com/"))
+        )
+        self.assertEqual(
+            Element.parse('<img src=x/><br /><p title=>x</p>'),
+            fragment(img(src="x/"), br(), p("x", title=""))
+        )
+
+    def test_parse_unclosed_markup(self):
+        # Unclosed markup used to be matched in quadratic or cubic time.
+        cases = [
+            ("<a" * 2000, "&lt;a" * 2000),
+            ("</a" * 2000, "&lt;/a" * 2000),
+            ("<!--a>" * 2000, ""),
+        ]
+        for data, expected in cases:
+            with self.subTest(data=data[:12]):
+                start = perf_counter()
+                parsed = Element.parse(data)
+                self.assertLess(perf_counter() - start, 1)
+                self.assertEqual(str(parsed), expected)
+
+    def test_parse_raw_text(self):
+        script_text = 'if (a < b) { html = "<div>&amp;</div>"; }'
+        self.assertEqual(
+            Element.parse(f"<script>{script_text}</script>"),
+            fragment(script(script_text))
+        )
+
+    @unittest.skipUnless(lxml, "lxml is not installed")
+    def test_parse_lxml(self):
+        documents = [
+            'Hello <div id="greeting" class="apple banana">'
+            '<!-- comment --><P>Fish &amp; chips</P> and '
+            '<orderedlist items="a,b"></orderedlist></div>!',
+            '<!DOCTYPE html>\n<html lang="en">\n'
+            '<head><title>Title</title></head>\n'
+            '<body>\n<p>x</p>\n</body>\n</html>\n',
+            '<html><body><p>x</p></body></html>',
+            '<head><title>Title</title></head>',
+            '   ',
+            'text<!-- comment -->more',
+            '<input disabled value=3>',
+            '<!-- <html> --><p>x</p>',
+            '<script>s="<body >"</script><p>y</p>',
+            '<html><body>x</body></html>\n<!-- </html> -->\n',
+        ]
+        for html in documents:
+            with self.subTest(html=html):
+                self.assertEqual(
+                    Element.parse(html, backend="lxml"),
+                    Element.parse(html)
+                )
+
+    def test_parse_unknown_backend(self):
+        with self.assertRaises(ValueError):
+            Element.parse("<p></p>", backend="nonexistent")
+
     def test_explicit_element_name(self):
         element_text = "The quick brown fox jumps over the lazy dog"
         element_id = "pangram"
@@ -46,6 +126,16 @@ class TestHtmlComp(unittest.TestCase):
             p(element_text, id=element_id)
         )
 
+    def test_rename(self):
+        element = div("text")
+        element.name = "orderedlist"
+        element.name = "p"
+        self.assertEqual(element, p("text"))
+        self.assertEqual(str(element), "<p>text</p>")
+
+        with self.assertRaises(KeyError):
+            element.name = "not-an-element"
+
     def test_callable(self):
         animals = ul(li("cat"))
 
@@ -59,6 +149,34 @@ class TestHtmlComp(unittest.TestCase):
             animals
         )
 
+    def test_copy(self):
+        element = OrderedList("a", id="list")
+        del element["_class"]
+
+        copied = element.copy()
+        self.assertEqual(copied, element)
+
+        copied("b", id="copy")
+        self.assertEqual(element.attributes, {"id": "list"})
+        self.assertEqual(element.children, ["a"])
+        self.assertNotIn("_class", copied)
+
+    def test_empty_element(self):
+        element = br()
+        self.assertEqual(element, br())
+        self.assertEqual(len(element), 0)
+        self.assertNotIn("id", element)
+
+        copied = element.copy()
+        element.children.append("a")
+        element.attributes["id"] = "foo"
+        self.assertEqual(element.children, ["a"])
+        self.assertEqual(element.attributes, {"id": "foo"})
+        self.assertEqual(copied, br())
+
+        copied.attributes
+        self.assertEqual(copied, br())
+
     def test_attribute(self):
         element = div()
         self.assertFalse("id" in element)
@@ -114,6 +232,90 @@ class TestHtmlComp(unittest.TestCase):
             fragment(ol(_class={"list", "fancy"})(li("hi")))
         )
 
+    def test_default_attributes_not_shared(self):
+        first = OrderedList()
+        second = OrderedList()
+        first["_class"].add("extra")
+        self.assertEqual(second["_class"], {"list", "fancy"})
+
+    def test_pure_component(self):
+        calls = []
+
+        @component(pure=True)
+        def Badge(*children, **attributes):
+            calls.append(children)
+            return span(*children, **attributes)
+
+        page = div(Badge("new"), Badge("new"), Badge("sale"), Badge(div()))
+        self.assertEqual(
+            str(page),
+            "<div><span>new</span><span>new</span><span>sale</span>"
+            "<span><div></div></span></div>"
+        )
+        # Element children are unhashable, so they are never cached.
+        self.assertEqual(len(calls), 3)
+
+        str(page)
+        self.assertEqual(len(calls), 4)
+
+    def test_pure_component_render_copies(self):
+        @component(pure=True)
+        def Tag(*children):
+            return span(*children, _class={"tag"})
+
+        div(Tag("a")).render()[0]["_class"].add("poisoned")
+        self.assertEqual(
+            str(div(Tag("a"))),
+            '<div><span class="tag">a</span></div>'
+        )
+
+    def test_render_normalizes(self):
+        self.assertEqual(
+            div("a", RedBox(), "b", fragment("c", ""), "", em("d")).render(),
+            div("a", RedBox().render(), "bc", em("d"))
+        )
+        self.assertEqual(ul(li("x"), li("y")).render(), ul(li("x"), li("y")))
+
+    def test_deep_render(self):
+        root = innermost = div()
+        for _ in range(5000):
+            innermost = innermost(RedBox())[0]
+
+        rendered = root.render()
+        for _ in range(5000):
+            rendered = rendered[0]
+            self.assertEqual(rendered["style"], "background-color: red;")
+        self.assertEqual(len(rendered), 0)
+
+        self.assertEqual(str(root).count("<div"), 5001)
+
+    def test_infinite_transform(self):
+        @component
+        def Loop():
+            return Loop()
+
+        with self.assertRaises(RecursionError):
+            Loop().render()
+        with self.assertRaises(RecursionError):
+            str(div(Loop()))
+
+    def test_escaping(self):
+        self.assertEqual(
+            str(p('1 < 2 & "3" > 0', title='"a" & <b>')),
+            '<p title="&quot;a&quot; &amp; <b&gt;">'
+            '1 &lt; 2 &amp; "3" &gt; 0</p>'
+        )
+        self.assertEqual(
+            str(script('if (a < b && c) {}')),
+            '<script>if (a < b && c) {}</script>'
+        )
+        # Every string child of a raw text element is written as-is, not
+        # only the text before the first child element.
+        self.assertEqual(
+            str(script("a<b", br(), "c<d")),
+            "<script>a<b<br>c<d</script>"
+        )
+
     def test_shallow_normalize(self):
         element = div(
             "a",
@@ -175,6 +377,11 @@ class TestHtmlComp(unittest.TestCase):
             )
         )
 
+    def test_normalize_nested(self):
+        element = div(ul(li("a", "", fragment("b", fragment("c")))), "d", "")
+        element.normalize()
+        self.assertEqual(element, div(ul(li("abc")), "d"))
+
     def test_mismatched_tags(self):
         with self.assertRaises(ParseError):
             Element.parse("<div></p>")